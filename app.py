@@ -6,12 +6,252 @@ This application provides a web interface and API endpoints for emotion/sentimen
 using IBM Watson NLP service.
 """
 
-from flask import Flask, render_template, request, jsonify
-from final_project import emotion_detector
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, url_for
+from final_project import emotion_detector, warm_up
+from final_project.EmotionDetection.normalize import normalize_text, content_hash
+from final_project.EmotionDetection.incremental import ResultIndex
+from watson_config import get_model_version, Deadline
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
 import json
+import os
+import re
+import threading
+import time
+
+# Split after sentence-ending punctuation or at line breaks
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+
+# Maximum number of sentences analyzed at once across all streaming requests;
+# kept below WATSON_POOL_SIZE so every call can reuse a pooled connection
+STREAM_CONCURRENCY = int(os.environ.get('STREAM_CONCURRENCY', '8'))
+
+# Number of results kept for ETag/GET lookups, and how long clients and
+# proxies may cache them (seconds)
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', '10000'))
+RESULT_CACHE_MAX_AGE = int(os.environ.get('RESULT_CACHE_MAX_AGE', '3600'))
+
+class ResultCache:
+    """Thread-safe LRU cache of emotion results keyed by ETag."""
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return the cached emotions for key, or None."""
+        with self._lock:
+            emotions = self._entries.get(key)
+            if emotions is not None:
+                self._entries.move_to_end(key)
+            return emotions
+    
+    def put(self, key, emotions):
+        """Cache emotions under key, evicting the least recently used entry."""
+        with self._lock:
+            self._entries[key] = emotions
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def __len__(self):
+        return len(self._entries)
+
+result_cache = ResultCache(RESULT_CACHE_SIZE)
+
+# Shared by all streaming requests so open streams cannot multiply the number
+# of threads and concurrent Watson calls. Threads start on first use.
+stream_pool = ThreadPoolExecutor(max_workers=STREAM_CONCURRENCY, thread_name_prefix='stream')
+
+def result_etag(text_hash, model_version=None):
+    """
+    Derive the ETag of a result from the content hash of its normalized text.
+    
+    The model version is folded in so results from a different model never
+    validate against an old ETag.
+    
+    Args:
+        text_hash: content_hash() of the normalized text
+        model_version: Model version (defaults to get_model_version())
+        
+    Returns:
+        Hex ETag string
+    """
+    if model_version is None:
+        model_version = get_model_version()
+    key = f"{model_version}\0{text_hash}".encode('utf-8')
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
+
+def detect_with_cache(text, etag, deadline=None):
+    """
+    Analyze already-normalized text, serving and filling the result cache.
+    
+    Args:
+        text: Normalized text to analyze
+        etag: result_etag() of the text
+        deadline: Optional client Deadline passed to emotion_detector
+        
+    Returns:
+        The emotion_detector result (dict on success, JSON error string otherwise)
+    """
+    cached = result_cache.get(etag)
+    if cached is not None:
+        return cached
+    result = emotion_detector(text, deadline=deadline)
+    if isinstance(result, dict):
+        result_cache.put(etag, result)
+    return result
+
+# Request headers carrying the client's deadline: a relative budget in seconds,
+# or an absolute Unix timestamp. A 'timeout' query/JSON parameter may be used
+# instead of the relative header.
+TIMEOUT_HEADER = 'X-Request-Timeout'
+DEADLINE_HEADER = 'X-Request-Deadline'
+
+def request_deadline():
+    """
+    Build the Deadline for the current request, if the client gave one.
+    
+    Returns:
+        Deadline or None
+        
+    Raises:
+        ValueError: If the header or parameter is not a number
+    """
+    if DEADLINE_HEADER in request.headers:
+        return Deadline.at_epoch(float(request.headers[DEADLINE_HEADER]))
+    
+    timeout = request.headers.get(TIMEOUT_HEADER, request.args.get('timeout'))
+    if timeout is None and request.is_json:
+        # Malformed bodies are left for the endpoint's own validation to report
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            timeout = payload.get('timeout')
+    if timeout is None:
+        return None
+    return Deadline.after(float(timeout))
+
+def deadline_exceeded_response():
+    """Build the 504 response for a request whose deadline passed."""
+    return jsonify({
+        'error': 'Deadline exceeded before the analysis completed',
+        'status': 'error'
+    }), 504
+
+def invalid_deadline_response():
+    """Build the 400 response for a malformed deadline or timeout."""
+    return jsonify({
+        'error': f'{TIMEOUT_HEADER}, {DEADLINE_HEADER} and timeout must be numbers',
+        'status': 'error'
+    }), 400
+
+def make_result_response(etag, emotions):
+    """
+    Build the success response for a result, tagged with its ETag.
+    
+    Content-Location points at the idempotent GET endpoint for the result.
+    """
+    response = jsonify({
+        'status': 'success',
+        'emotions': emotions
+    })
+    response.set_etag(etag)
+    response.headers['Content-Location'] = url_for('emotion_result_api', etag=etag)
+    return response
+
+def etag_matches(etag):
+    """
+    Check whether the request's If-None-Match lists this concrete ETag.
+    
+    The "*" tag is ignored: a POST of a text that was never analyzed must not
+    get a 304, and a lookup of an unknown ETag must not either.
+    """
+    return etag in request.if_none_match.as_set(include_weak=True)
+
+def not_modified(etag):
+    """Build an empty 304 response for the given ETag."""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+# Startup warm-up: pooled Watson connections to open, time budget (seconds),
+# and an optional persistent result index (see EmotionDetection.incremental)
+# to preload into the result cache. Set SKIP_WARMUP=1 to report ready at once.
+WARMUP_CONNECTIONS = int(os.environ.get('WARMUP_CONNECTIONS', '4'))
+WARMUP_TIMEOUT = float(os.environ.get('WARMUP_TIMEOUT', '5'))
+WARMUP_RESULT_INDEX = os.environ.get('WARMUP_RESULT_INDEX')
+
+# Warm-up state of this process; 'pid' tells a forked worker it has not warmed up yet
+readiness = {'ready': False, 'warmup': None, 'pid': None}
+_warm_up_lock = threading.Lock()
+
+def preload_result_cache(index_path, model_version):
+    """
+    Load results for the current model version from a ResultIndex into the cache.
+    
+    Returns:
+        Number of results loaded (at most RESULT_CACHE_SIZE)
+    """
+    loaded = 0
+    with ResultIndex(index_path) as index:
+        for text_hash, emotions in index.iter_results(model_version):
+            if loaded >= RESULT_CACHE_SIZE:
+                break
+            result_cache.put(result_etag(text_hash, model_version), emotions)
+            loaded += 1
+    return loaded
+
+def warm_up_service():
+    """
+    Startup phase run before the service reports ready.
+    
+    Resolves the Watson configuration, pays first-call costs of the request
+    path, opens pooled connections to Watson and optionally preloads the
+    result cache. Failures are recorded but do not block readiness, so a
+    Watson outage does not take every instance out of the load balancer.
+    """
+    started = time.monotonic()
+    details = {}
+    try:
+        model_version = get_model_version()
+        result_etag(content_hash(normalize_text('warm up')), model_version)
+        # /health is unauthenticated, so report counts only, not the endpoint URL
+        connections = warm_up(WARMUP_CONNECTIONS, timeout=WARMUP_TIMEOUT)
+        details['connections'] = {key: connections[key] for key in ('connections', 'failed', 'elapsed')}
+        if WARMUP_RESULT_INDEX:
+            details['cached_results'] = preload_result_cache(WARMUP_RESULT_INDEX, model_version)
+    except Exception as e:
+        details['error'] = f'{type(e).__name__}: {str(e)}'
+    details['elapsed'] = time.monotonic() - started
+    readiness.update(ready=True, warmup=details)
+
+def start_warm_up():
+    """
+    Start the warm-up once per process, in the background so /health can
+    report progress meanwhile.
+    
+    Called on each process's first request rather than at import: pre-fork
+    servers (e.g. gunicorn --preload) import the app before forking, and a
+    warm-up thread and pooled sockets from the parent would not carry over
+    to the workers. The debug reloader's file-watching parent never serves,
+    so it never warms up either.
+    """
+    if readiness['pid'] == os.getpid():
+        return
+    with _warm_up_lock:
+        if readiness['pid'] == os.getpid():
+            return
+        readiness.update(ready=False, warmup=None, pid=os.getpid())
+        if os.environ.get('SKIP_WARMUP'):
+            readiness.update(ready=True, warmup={'skipped': True})
+            return
+        threading.Thread(target=warm_up_service, name='warm-up', daemon=True).start()
 
 # Initialize Flask app
 app = Flask(__name__)
+app.before_request(start_warm_up)
 
 @app.route('/')
 def render_index_page():
@@ -29,14 +269,31 @@ def emotion_detector_api():
     API endpoint for emotion detection.
     
     Accepts JSON or form data with 'text' field and returns emotion analysis results.
+    Successful results carry an ETag derived from the normalized text and model
+    version. A matching If-None-Match gets a 304, and repeated texts are served
+    from the result cache, without calling Watson.
+    
+    The client's deadline (see request_deadline) caps the Watson call; once it
+    has passed, the request is answered with 504 instead of being analyzed.
     
     Returns:
         JSON response with emotion analysis results or error message
     """
     try:
+        try:
+            deadline = request_deadline()
+        except (TypeError, ValueError):
+            return invalid_deadline_response()
+        
         # Get text from request (support both JSON and form data)
         if request.is_json:
-            text_to_analyze = request.json.get('text', '')
+            payload = request.get_json(silent=True)
+            if not isinstance(payload, dict):
+                return jsonify({
+                    'error': 'JSON body must be an object with a "text" field',
+                    'status': 'error'
+                }), 400
+            text_to_analyze = payload.get('text', '')
         else:
             text_to_analyze = request.form.get('text', '')
         
@@ -47,16 +304,29 @@ def emotion_detector_api():
                 'status': 'error'
             }), 400
         
+        # Identical normalized texts share one ETag and one cached result
+        text_to_analyze = normalize_text(text_to_analyze)
+        etag = result_etag(content_hash(text_to_analyze))
+        if etag_matches(etag):
+            return not_modified(etag)
+        
+        cached = result_cache.get(etag)
+        if cached is not None:
+            return make_result_response(etag, cached), 200
+        
+        # The client has already given up; don't spend upstream quota on it
+        if deadline is not None and deadline.expired:
+            return deadline_exceeded_response()
+        
         # Perform emotion detection
-        result = emotion_detector(text_to_analyze)
+        result = detect_with_cache(text_to_analyze, etag, deadline)
         
         # Check if result is a dict (success) or string (error)
         if isinstance(result, dict):
             # Successful analysis
-            return jsonify({
-                'status': 'success',
-                'emotions': result
-            }), 200
+            return make_result_response(etag, result), 200
+        elif deadline is not None and deadline.expired:
+            return deadline_exceeded_response()
         else:
             # Result is a JSON string, likely an error
             try:
@@ -91,18 +361,209 @@ def emotion_detector_api():
             'status': 'error'
         }), 500
 
+@app.route('/emotionDetector/<etag>', methods=['GET'])
+def emotion_result_api(etag):
+    """
+    Idempotent, cacheable lookup of a previously computed result.
+    
+    The ETag is the one returned by POST /emotionDetector. Responses carry
+    Cache-Control so CDNs and reverse proxies can serve repeats, and a matching
+    If-None-Match gets a 304.
+    
+    Returns:
+        JSON response with the cached emotions, or 404 if the result is not cached
+    """
+    if etag_matches(etag):
+        response = not_modified(etag)
+    else:
+        emotions = result_cache.get(etag)
+        if emotions is None:
+            return jsonify({
+                'error': 'Result not found; POST the text to /emotionDetector',
+                'status': 'error'
+            }), 404
+        response = make_result_response(etag, emotions)
+    response.headers['Cache-Control'] = f'public, max-age={RESULT_CACHE_MAX_AGE}, immutable'
+    return response
+
+def split_into_chunks(text):
+    """
+    Split text into the sentence-sized chunks scored by the streaming endpoint.
+    
+    Args:
+        text: The text to split
+        
+    Returns:
+        List of non-empty, stripped chunks
+    """
+    return [chunk.strip() for chunk in SENTENCE_BOUNDARY.split(text) if chunk.strip()]
+
+def parse_detector_result(result):
+    """
+    Normalize an emotion_detector result into (emotions, error).
+    
+    Returns:
+        Tuple of the emotions dict (or None) and an error dict (or None)
+    """
+    if isinstance(result, dict):
+        return result, None
+    try:
+        result_dict = json.loads(result)
+    except (TypeError, json.JSONDecodeError):
+        return None, {'error': 'Invalid response format', 'details': str(result)}
+    if 'error' in result_dict:
+        return None, {'error': result_dict['error'], 'details': result_dict.get('details', '')}
+    return None, {'error': 'Invalid response format', 'details': result}
+
+@app.route('/emotionDetector/stream', methods=['POST'])
+def emotion_detector_stream_api():
+    """
+    Streaming API endpoint for emotion detection.
+    
+    Accepts the same 'text' field as /emotionDetector, or a JSON 'texts' list.
+    Text is split into sentences which are scored concurrently (at most
+    STREAM_CONCURRENCY at a time across all streams) and sent as each one finishes, as
+    newline-delimited JSON (application/x-ndjson):
+    
+        {"type": "start", "chunks": N}
+        {"type": "chunk", "index": i, "text": ..., "status": "success", "emotions": {...}}
+        {"type": "summary", "status": "success", "emotions": {...}, "etag": ...}
+    
+    Chunk events arrive in completion order; use "index" to place them. Failed
+    chunks carry "status": "error" with "error" and "details" instead of
+    "emotions". The summary is the document-level result for the whole input,
+    the same result (and ETag) /emotionDetector returns for it; it is not an
+    average of the sentence scores. A 'texts' list is summarized as one
+    document: its texts joined with spaces, so the summary ETag is the one
+    /emotionDetector returns for that joined text. All calls go through the same text
+    normalization and result cache as /emotionDetector, and identical
+    sentences are only analyzed once, so the stream costs at most one Watson
+    call per distinct sentence plus one for the document.
+    
+    If the client's deadline passes mid-stream, chunks not yet started are
+    not analyzed and the summary reports how many were abandoned.
+    
+    Returns:
+        Streaming NDJSON response, or a JSON error for invalid input
+    """
+    try:
+        deadline = request_deadline()
+    except (TypeError, ValueError):
+        return invalid_deadline_response()
+    
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({
+                'error': 'JSON body must be an object with a "text" or "texts" field',
+                'status': 'error'
+            }), 400
+        texts = payload.get('texts')
+        if texts is None:
+            texts = [payload.get('text', '')]
+    else:
+        texts = [request.form.get('text', '')]
+    
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return jsonify({
+            'error': "'texts' must be a list of strings",
+            'status': 'error'
+        }), 400
+    
+    chunks = [normalize_text(chunk) for text in texts for chunk in split_into_chunks(text)]
+    if not chunks:
+        return jsonify({
+            'error': 'No text provided for analysis',
+            'status': 'error'
+        }), 400
+    document = normalize_text(' '.join(chunks))
+    document_etag = result_etag(content_hash(document))
+    
+    def analyze(text, etag):
+        # Work still queued once the client has given up is abandoned
+        if deadline is not None and deadline.expired:
+            return None
+        return detect_with_cache(text, etag, deadline)
+    
+    def generate():
+        yield json.dumps({'type': 'start', 'chunks': len(chunks)}) + '\n'
+        
+        # One future per distinct text; the document goes first so it
+        # runs alongside the sentences
+        futures = {document_etag: stream_pool.submit(analyze, document, document_etag)}
+        try:
+            chunk_indexes = {}
+            for index, chunk in enumerate(chunks):
+                etag = result_etag(content_hash(chunk))
+                if etag not in futures:
+                    futures[etag] = stream_pool.submit(analyze, chunk, etag)
+                chunk_indexes.setdefault(futures[etag], []).append(index)
+            
+            abandoned = 0
+            for future in as_completed(chunk_indexes):
+                result = future.result()
+                for index in chunk_indexes[future]:
+                    event = {'type': 'chunk', 'index': index, 'text': chunks[index]}
+                    if result is None:
+                        abandoned += 1
+                        continue
+                    emotions, error = parse_detector_result(result)
+                    if error is None:
+                        event.update(status='success', emotions=emotions)
+                    else:
+                        event.update(status='error', **error)
+                    yield json.dumps(event) + '\n'
+            
+            result = futures[document_etag].result()
+            summary = {'type': 'summary'}
+            if result is None:
+                summary.update(status='error', error='Deadline exceeded before the analysis completed')
+            else:
+                emotions, error = parse_detector_result(result)
+                if error is None:
+                    summary.update(status='success', emotions=emotions, etag=document_etag)
+                else:
+                    summary.update(status='error', **error)
+            if abandoned or (deadline is not None and deadline.expired):
+                summary['abandoned'] = abandoned
+                summary['deadline_exceeded'] = True
+            yield json.dumps(summary) + '\n'
+        finally:
+            # Also runs when the client disconnects: drop this stream's work not yet started
+            for future in futures.values():
+                future.cancel()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={
+        # Ask reverse proxies not to buffer the stream
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """
     Health check endpoint for monitoring.
     
+    Reports 503 "warming_up" until this process's warm-up has finished, so
+    load balancers only route traffic to warm instances. The first request
+    (usually the first health check) starts the warm-up.
+    
     Returns:
         JSON response indicating service health
     """
+    if not readiness['ready']:
+        return jsonify({
+            'status': 'warming_up',
+            'ready': False,
+            'service': 'Emotion Detection API',
+            'version': '1.0.0'
+        }), 503
     return jsonify({
         'status': 'healthy',
+        'ready': True,
         'service': 'Emotion Detection API',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'warmup': readiness['warmup']
     }), 200
 
 @app.errorhandler(404)
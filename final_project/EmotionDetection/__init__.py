@@ -7,10 +7,46 @@ This package provides functionality to analyze text and detect emotions.
 Main Functions:
     emotion_detector: Analyzes text and returns emotion scores with dominant emotion
     sentiment_analyzer: Legacy function for backward compatibility
+    warm_up: Opens pooled connections to Watson before the first request
+    emotion_detector_batch: Analyzes many texts into a columnar EmotionBatchResult
+    dominant_emotion_codes, sentiment_from_scores: Vectorized post-processing
+        over an N x 5 score matrix (requires numpy)
+    Deduplicator: Normalize-and-group stage that scores each distinct text once
+    incremental_score: Re-scores only new, changed or stale records using a ResultIndex
 """
 
-from .emotion_detection import emotion_detector, sentiment_analyzer
+from .emotion_detection import emotion_detector, sentiment_analyzer, warm_up, Deadline
+from .batch import emotion_detector_batch
+from .results import EmotionBatchResult, EMOTIONS, DOMINANT_CATEGORIES
+from .normalize import Deduplicator, DedupStats, normalize_text, content_hash
+from .incremental import ResultIndex, IncrementalRun, incremental_score
+from .postprocess import (
+    dominant_emotion,
+    dominant_emotion_codes,
+    sentiment_from_scores,
+    SENTIMENT_LABELS,
+)
 
 __version__ = "1.0.0"
 __author__ = "Your Name"
-__all__ = ["emotion_detector", "sentiment_analyzer"]
+__all__ = [
+    "emotion_detector",
+    "sentiment_analyzer",
+    "warm_up",
+    "Deadline",
+    "emotion_detector_batch",
+    "EmotionBatchResult",
+    "EMOTIONS",
+    "DOMINANT_CATEGORIES",
+    "dominant_emotion",
+    "dominant_emotion_codes",
+    "sentiment_from_scores",
+    "SENTIMENT_LABELS",
+    "Deduplicator",
+    "DedupStats",
+    "normalize_text",
+    "content_hash",
+    "ResultIndex",
+    "IncrementalRun",
+    "incremental_score",
+]
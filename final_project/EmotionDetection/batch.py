@@ -0,0 +1,50 @@
+"""
+Batch emotion detection.
+
+Scores many texts with ``emotion_detector`` and collects the results in a
+columnar ``EmotionBatchResult`` instead of a list of dicts. An optional
+``Deduplicator`` in front of the scorer makes sure each distinct text is
+only sent upstream once.
+"""
+
+from .emotion_detection import emotion_detector, deadline_exceeded_error
+from .results import EmotionBatchResult
+
+
+def score_with_deadline(detector, text, deadline):
+    """Score one text, abandoning it if the deadline has already passed."""
+    if deadline is None:
+        return detector(text)
+    if deadline.expired:
+        return deadline_exceeded_error(deadline)
+    return detector(text, deadline=deadline)
+
+
+def emotion_detector_batch(texts, detector=emotion_detector, dedup=None, deadline=None):
+    """Analyze the emotion of every text in ``texts``.
+
+    Args:
+        texts: Iterable of strings to analyze
+        detector: Single-text scoring function (defaults to ``emotion_detector``)
+        dedup (Deduplicator): Optional normalize-and-group stage. When given,
+            only its unique normalized texts are scored and ``dedup.stats``
+            reports the dedup ratio for the run.
+        deadline (Deadline): Optional deadline for the whole batch. It is
+            passed to ``detector`` (which must then accept a ``deadline``
+            keyword), and texts still queued once it passes are recorded as
+            error rows without being sent upstream.
+
+    Returns:
+        EmotionBatchResult: One row per input text, in input order. Texts that
+        failed to score are recorded as error rows.
+    """
+    if dedup is None:
+        batch = EmotionBatchResult()
+        for text in texts:
+            batch.append(score_with_deadline(detector, text, deadline))
+        return batch
+
+    unique = EmotionBatchResult()
+    for text in dedup.unique_texts(texts):
+        unique.append(score_with_deadline(detector, text, deadline))
+    return unique.take(dedup.row_ids)
@@ -8,25 +8,111 @@ This module can be run from the command line to analyze text sentiment.
 import requests
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import ConnectionError, Timeout, RequestException
 
 # Try to import watson_config from parent directory or current directory
 try:
-    from ..watson_config import get_watson_config, format_watson_response, USE_PUBLIC_WATSON
+    from ..watson_config import get_watson_config, get_model_version, get_request_timeout, Deadline, CONNECT_TIMEOUT, format_watson_response, USE_PUBLIC_WATSON
 except ImportError:
     # If running as a script or watson_config is in the same directory
     import sys
     current_dir = os.path.dirname(os.path.abspath(__file__))
     parent_dir = os.path.dirname(current_dir)
     sys.path.insert(0, parent_dir)
-    from watson_config import get_watson_config, format_watson_response, USE_PUBLIC_WATSON
+    from watson_config import get_watson_config, get_model_version, get_request_timeout, Deadline, CONNECT_TIMEOUT, format_watson_response, USE_PUBLIC_WATSON
 
-def emotion_detector(text_to_analyse):  # Define a function named emotion_detector that takes a string input (text_to_analyse)
+try:
+    from .postprocess import dominant_emotion, sentiment_from_emotions
+except ImportError:
+    # Running as a script: the parent directory is now on sys.path
+    from EmotionDetection.postprocess import dominant_emotion, sentiment_from_emotions
+
+# Maximum number of pooled connections kept open to the Watson endpoint
+POOL_SIZE = int(os.environ.get('WATSON_POOL_SIZE', '10'))
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Get the shared HTTP session whose connections to Watson are pooled and reused."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+def _reset_session_after_fork():
+    # A forked child must not share the parent's pooled sockets
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_session_after_fork)
+
+def warm_up(connections=None, timeout=None):
+    """Open pooled connections to the Watson endpoint ahead of the first request.
+
+    Resolves the configuration and sends concurrent lightweight HEAD requests
+    so that DNS resolution and TCP/TLS setup are paid before real traffic
+    arrives. The response status does not matter; the connections stay in
+    the shared session's pool for ``emotion_detector`` to reuse.
+
+    Args:
+        connections (int): Number of connections to open (defaults to POOL_SIZE)
+        timeout (float): Overall time budget in seconds (defaults to CONNECT_TIMEOUT)
+        
+    Returns:
+        dict: Endpoint URL, connections opened and failed, and elapsed seconds
+    """
+    config = get_watson_config()
+    session = get_session()
+    connections = POOL_SIZE if connections is None else min(POOL_SIZE, connections)
+    deadline = Deadline.after(timeout if timeout is not None else CONNECT_TIMEOUT)
+    started = time.monotonic()
+
+    def open_connection(_):
+        try:
+            session.head(config["url"], headers=config["headers"],
+                         timeout=get_request_timeout(deadline)).close()
+            return True
+        except (RequestException, ValueError):
+            return False
+
+    opened = 0
+    if connections > 0:
+        # Concurrent requests each need their own connection, filling the pool
+        with ThreadPoolExecutor(max_workers=connections) as pool:
+            opened = sum(pool.map(open_connection, range(connections)))
+    return {
+        "endpoint": config["url"],
+        "connections": opened,
+        "failed": connections - opened,
+        "elapsed": time.monotonic() - started
+    }
+
+def deadline_exceeded_error(deadline):
+    """Build the JSON error returned when the caller's deadline has passed."""
+    error_msg = "Deadline Exceeded: The caller's deadline passed before the analysis completed."
+    return json.dumps({"error": error_msg, "details": repr(deadline)})
+
+def emotion_detector(text_to_analyse, deadline=None):  # Define a function named emotion_detector that takes a string input (text_to_analyse)
     """Analyze emotion of the given text using Watson NLP service.
 
     Args:
         text_to_analyse (str): The text to analyze
+        deadline (Deadline): Optional deadline of the caller. The request is
+            not sent once it has passed, and it caps the connect/read timeouts.
         
     Returns:
         str: JSON response from the sentiment analysis service
@@ -37,13 +123,18 @@ def emotion_detector(text_to_analyse):  # Define a function named emotion_detect
     header = config["headers"]
     myobj = config["payload_format"](text_to_analyse)
     
+    # Separate connect and read timeouts, capped by the caller's deadline
+    timeout = get_request_timeout(deadline)
+    if min(timeout) <= 0:
+        return deadline_exceeded_error(deadline)
+    
     try:
         # Add authentication for public Watson API
         if USE_PUBLIC_WATSON:
             auth = HTTPBasicAuth('apikey', os.environ.get('WATSON_API_KEY', ''))
-            response = requests.post(api_url, json=myobj, headers=header, auth=auth, timeout=10)
+            response = get_session().post(api_url, json=myobj, headers=header, auth=auth, timeout=timeout)
         else:
-            response = requests.post(api_url, json=myobj, headers=header, timeout=10)  # Send a POST request to the API with the text and headers and a timeout
+            response = get_session().post(api_url, json=myobj, headers=header, timeout=timeout)  # Send a POST request to the API with the text and headers and a timeout
         response.raise_for_status()  # Raise an exception for bad status codes
         
         # Parse the Watson response
@@ -53,17 +144,14 @@ def emotion_detector(text_to_analyse):  # Define a function named emotion_detect
         if 'emotion' in response_data and 'document' in response_data['emotion']:
             emotions = response_data['emotion']['document']['emotion']
             
-            # Find the dominant emotion
-            dominant_emotion = max(emotions.items(), key=lambda x: x[1])[0]
-            
-            # Return in the required format
+            # Return in the required format; all-zero scores give 'none'
             return {
                 'anger': emotions.get('anger', 0),
                 'disgust': emotions.get('disgust', 0),
                 'fear': emotions.get('fear', 0),
                 'joy': emotions.get('joy', 0),
                 'sadness': emotions.get('sadness', 0),
-                'dominant_emotion': dominant_emotion
+                'dominant_emotion': dominant_emotion(emotions)
             }
         else:
             # If emotion data is not available, return zeros
@@ -76,11 +164,17 @@ def emotion_detector(text_to_analyse):  # Define a function named emotion_detect
                 'dominant_emotion': 'none'
             }
     except ConnectionError as e:
+        # requests' ConnectTimeout is both a ConnectionError and a Timeout, so
+        # a connect cut short by the deadline lands here
+        if deadline is not None and deadline.expired:
+            return deadline_exceeded_error(deadline)
         # Handle connection errors
         error_msg = f"Connection Error: Unable to reach the sentiment analysis service. The service may be down or unreachable from your network."
         print(error_msg)
         return json.dumps({"error": error_msg, "details": str(e)})
     except Timeout as e:
+        if deadline is not None and deadline.expired:
+            return deadline_exceeded_error(deadline)
         # Handle timeout errors
         error_msg = "Timeout Error: The request to the sentiment analysis service timed out."
         print(error_msg)
@@ -97,28 +191,19 @@ def emotion_detector(text_to_analyse):  # Define a function named emotion_detect
         return json.dumps({"error": error_msg, "details": str(e)})
 
 # Alias for backward compatibility with tests
-def sentiment_analyzer(text_to_analyse):
+def sentiment_analyzer(text_to_analyse, deadline=None):
     """Alias for emotion_detector to maintain compatibility with tests.
     
     Converts emotion analysis to sentiment format for backward compatibility.
     """
-    result = emotion_detector(text_to_analyse)
+    result = emotion_detector(text_to_analyse, deadline=deadline)
     
     # If it's already a string (error), return as-is
     if isinstance(result, str):
         return result
     
     # Convert emotion to sentiment based on dominant emotion
-    if result['dominant_emotion'] in ['joy']:
-        sentiment = 'positive'
-        score = result['joy']
-    elif result['dominant_emotion'] in ['anger', 'disgust', 'fear', 'sadness']:
-        sentiment = 'negative'
-        # Use the dominant negative emotion's score
-        score = -result[result['dominant_emotion']]
-    else:
-        sentiment = 'neutral'
-        score = 0.0
+    sentiment, score = sentiment_from_emotions(result)
     
     return json.dumps({
         "documentSentiment": {
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Incremental bulk scoring.
+
+Nightly jobs re-submit whole datasets although only a small fraction of the
+records change between runs. ``ResultIndex`` persists, in an SQLite file,
+
+    - content hash -> result and the model version it was scored with
+    - record id -> content hash of the record's last scored text
+
+so ``incremental_score`` only sends upstream the records that are new, whose
+text changed, or whose cached result came from a different model version
+(see ``watson_config.get_model_version``). Everything else is served from the
+index, and the records whose result changed are emitted as a delta.
+
+Command line usage (input is JSON Lines with ``id`` and ``text`` fields):
+    python -m EmotionDetection.incremental index.sqlite3 records.jsonl --delta delta.jsonl
+"""
+
+import json
+import sqlite3
+import time
+
+from .batch import score_with_deadline
+from .emotion_detection import emotion_detector, get_model_version
+from .normalize import normalize_text, content_hash
+from .results import EmotionBatchResult, EMOTIONS
+
+# Record statuses reported by ``incremental_score``
+NEW = 'new'
+CHANGED = 'changed'
+STALE = 'stale'
+UNCHANGED = 'unchanged'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    content_hash TEXT PRIMARY KEY,
+    model_version TEXT NOT NULL,
+    anger REAL, disgust REAL, fear REAL, joy REAL, sadness REAL,
+    dominant_emotion TEXT NOT NULL,
+    scored_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    record_id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL
+);
+"""
+
+
+class ResultIndex:
+    """Persistent content-hash -> result index backed by SQLite.
+
+    Args:
+        path (str): Index file path (created if missing)
+        commit_every (int): Number of writes between commits, so an
+            interrupted run keeps most of its progress
+    """
+
+    def __init__(self, path, commit_every=1000):
+        self.path = path
+        self.commit_every = commit_every
+        self._pending = 0
+        self._db = sqlite3.connect(path)
+        self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def lookup(self, digest):
+        """Return ``(model_version, result)`` for a content hash, or ``None``."""
+        row = self._db.execute(
+            'SELECT model_version, anger, disgust, fear, joy, sadness, dominant_emotion '
+            'FROM results WHERE content_hash = ?', (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        result = dict(zip(EMOTIONS, row[1:6]))
+        result['dominant_emotion'] = row[6]
+        return row[0], result
+
+    def record_hash(self, record_id):
+        """Return the content hash last scored for ``record_id``, or ``None``."""
+        row = self._db.execute('SELECT content_hash FROM records WHERE record_id = ?',
+                               (record_id,)).fetchone()
+        return row[0] if row else None
+
+    def store(self, digest, model_version, result):
+        """Store the result for a content hash."""
+        self._db.execute(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (digest, model_version, *(result[e] for e in EMOTIONS),
+             result['dominant_emotion'], time.time())
+        )
+        self._wrote()
+
+    def set_record(self, record_id, digest):
+        """Point ``record_id`` at the content hash it was scored with."""
+        self._db.execute('INSERT OR REPLACE INTO records VALUES (?, ?)', (record_id, digest))
+        self._wrote()
+
+    def iter_results(self, model_version=None):
+        """Yield ``(content_hash, result)`` pairs, optionally for one model version."""
+        query = ('SELECT content_hash, anger, disgust, fear, joy, sadness, dominant_emotion '
+                 'FROM results')
+        params = ()
+        if model_version is not None:
+            query += ' WHERE model_version = ?'
+            params = (model_version,)
+        for row in self._db.execute(query, params):
+            result = dict(zip(EMOTIONS, row[1:6]))
+            result['dominant_emotion'] = row[6]
+            yield row[0], result
+
+    def commit(self):
+        """Flush pending writes to disk."""
+        self._db.commit()
+        self._pending = 0
+
+    def close(self):
+        """Commit and close the index."""
+        if self._db is not None:
+            self.commit()
+            self._db.close()
+            self._db = None
+
+    def _wrote(self):
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+
+
+class IncrementalRun:
+    """Outcome of one ``incremental_score`` run.
+
+    Attributes:
+        results (EmotionBatchResult): One row per input record, in input order
+        delta_ids (list): Ids of the records whose result changed this run
+        delta (list): Result dicts for ``delta_ids``, in the same order, exactly
+            as scored and indexed (not narrowed to float32 like ``results``)
+        counts (dict): Number of records per status (new, changed, stale,
+            unchanged, failed)
+        upstream_calls (int): Number of texts actually sent to Watson
+    """
+
+    def __init__(self):
+        self.results = EmotionBatchResult()
+        self.delta_ids = []
+        self.delta = []
+        self.counts = {status: 0 for status in (NEW, CHANGED, STALE, UNCHANGED, FAILED)}
+        self.upstream_calls = 0
+
+    def iter_delta(self):
+        """Yield ``(record_id, result)`` for every record in the delta."""
+        return zip(self.delta_ids, self.delta)
+
+    def write_delta(self, path):
+        """Write the delta as JSON Lines: one ``{"id": ..., **result}`` per record."""
+        with open(path, 'w', encoding='utf-8') as f:
+            for record_id, result in self.iter_delta():
+                f.write(json.dumps({'id': record_id, **result}) + '\n')
+
+
+def incremental_score(records, index, detector=emotion_detector, model_version=None,
+                      normalize=normalize_text, deadline=None):
+    """Score only the records that are new, changed or stale.
+
+    Args:
+        records: Iterable of ``(record_id, text)`` pairs
+        index (ResultIndex): Persistent index, updated in place
+        detector: Single-text scoring function (defaults to ``emotion_detector``)
+        model_version (str): Version to score against (defaults to
+            ``get_model_version()``)
+        normalize: Text normalization applied before hashing and scoring
+        deadline (Deadline): Optional deadline for the run. Records that
+            still need scoring once it passes are reported as failed (and
+            retried next run) without being sent upstream.
+
+    Returns:
+        IncrementalRun: Full results, delta and per-status counts. Records that
+        fail to score are not indexed, so the next run retries them.
+    """
+    if model_version is None:
+        model_version = get_model_version()
+
+    run = IncrementalRun()
+    for record_id, text in records:
+        text = normalize(text)
+        digest = content_hash(text)
+        previous = index.record_hash(record_id)
+        cached = index.lookup(digest)
+
+        if cached is not None and cached[0] == model_version:
+            result = cached[1]
+            status = UNCHANGED if previous == digest else (NEW if previous is None else CHANGED)
+        else:
+            if deadline is None or not deadline.expired:
+                run.upstream_calls += 1
+            result = score_with_deadline(detector, text, deadline)
+            if not isinstance(result, dict):
+                status = FAILED
+            else:
+                index.store(digest, model_version, result)
+                if previous is None:
+                    status = NEW
+                elif previous != digest:
+                    status = CHANGED
+                else:
+                    status = STALE
+
+        run.counts[status] += 1
+        run.results.append(result)
+        if status == FAILED:
+            continue
+        if previous != digest:
+            index.set_record(record_id, digest)
+        if status != UNCHANGED:
+            run.delta_ids.append(record_id)
+            run.delta.append(result)
+
+    index.commit()
+    return run
+
+
+def main():
+    """Run an incremental scoring pass over a JSON Lines file."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Incrementally score records, re-scoring only new, changed or stale ones'
+    )
+    parser.add_argument('index', help='Path of the persistent result index (SQLite)')
+    parser.add_argument('input', help='JSON Lines file with "id" and "text" fields')
+    parser.add_argument('--delta', help='Write records whose result changed to this JSON Lines file')
+    parser.add_argument('--id-field', default='id', help='Record id field name (default: id)')
+    parser.add_argument('--text-field', default='text', help='Text field name (default: text)')
+    args = parser.parse_args()
+
+    def read_records():
+        with open(args.input, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield str(record[args.id_field]), record[args.text_field]
+
+    with ResultIndex(args.index) as index:
+        run = incremental_score(read_records(), index)
+
+    if args.delta:
+        run.write_delta(args.delta)
+    print(json.dumps({'counts': run.counts, 'upstream_calls': run.upstream_calls,
+                      'delta': len(run.delta_ids)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Text normalization and de-duplication for bulk inputs.
+
+Bulk runs often contain the same text many times over (retweets, templated
+messages, re-submitted records). ``Deduplicator`` normalizes each input and
+groups identical texts so every unique string is sent to Watson once; the
+batch path then fans the unique results back out to every input row.
+
+The set of seen texts is kept as 16-byte digests in memory, up to
+``max_memory_keys``. Past that, further digests spill to an SQLite file so
+very large inputs stay memory-bounded.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import unicodedata
+from array import array
+
+URL_PATTERN = re.compile(r'(?:https?://|www\.)\S+', re.IGNORECASE)
+MENTION_PATTERN = re.compile(r'(?<!\w)@\w+')
+
+URL_TOKEN = '<url>'
+MENTION_TOKEN = '<mention>'
+
+
+def normalize_text(text, casefold=False, mask_urls=False, mask_mentions=False):
+    """Normalize text so that trivially different inputs compare equal.
+
+    Applies Unicode NFKC normalization and collapses runs of whitespace,
+    optionally masking URLs and @mentions and case folding.
+
+    Args:
+        text (str): The text to normalize
+        casefold (bool): Case fold the text
+        mask_urls (bool): Replace URLs with ``URL_TOKEN``
+        mask_mentions (bool): Replace @mentions with ``MENTION_TOKEN``
+
+    Returns:
+        str: The normalized text
+    """
+    text = unicodedata.normalize('NFKC', text)
+    if mask_urls:
+        text = URL_PATTERN.sub(URL_TOKEN, text)
+    if mask_mentions:
+        text = MENTION_PATTERN.sub(MENTION_TOKEN, text)
+    text = ' '.join(text.split())
+    if casefold:
+        text = text.casefold()
+    return text
+
+
+def content_digest(text):
+    """Return the 16-byte BLAKE2b digest used to identify a text."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def content_hash(text):
+    """Return the hex form of ``content_digest``."""
+    return content_digest(text).hex()
+
+
+class DedupStats:
+    """Counts from one de-duplication run."""
+
+    def __init__(self):
+        self.total = 0
+        self.unique = 0
+        self.spilled = 0
+
+    @property
+    def duplicates(self):
+        """Number of inputs that did not need their own upstream call."""
+        return self.total - self.unique
+
+    @property
+    def dedup_ratio(self):
+        """Inputs per unique text (1.0 means no duplicates)."""
+        return self.total / self.unique if self.unique else 1.0
+
+    @property
+    def saved_fraction(self):
+        """Fraction of upstream calls avoided."""
+        return self.duplicates / self.total if self.total else 0.0
+
+    def as_dict(self):
+        """Return the stats as a plain dict for logging or JSON output."""
+        return {
+            'total': self.total,
+            'unique': self.unique,
+            'duplicates': self.duplicates,
+            'dedup_ratio': self.dedup_ratio,
+            'saved_fraction': self.saved_fraction,
+            'spilled': self.spilled,
+        }
+
+    def __repr__(self):
+        return (f"DedupStats(total={self.total}, unique={self.unique}, "
+                f"dedup_ratio={self.dedup_ratio:.2f})")
+
+
+class Deduplicator:
+    """Streaming normalize-and-group stage for bulk scoring.
+
+    ``unique_texts`` consumes the input lazily and yields each normalized
+    text the first time it is seen. Meanwhile ``row_ids`` records, for every
+    input row, the position of its text among the yielded unique texts, which
+    is what ``EmotionBatchResult.take`` needs to fan results back out.
+
+    Args:
+        casefold (bool): Case fold texts before grouping
+        mask_urls (bool): Mask URLs before grouping
+        mask_mentions (bool): Mask @mentions before grouping
+        max_memory_keys (int): Digests kept in memory before spilling to disk;
+            ``None`` keeps everything in memory
+        spill_dir (str): Directory for the spill file (system temp dir by default)
+    """
+
+    def __init__(self, casefold=False, mask_urls=False, mask_mentions=False,
+                 max_memory_keys=1_000_000, spill_dir=None):
+        self.casefold = casefold
+        self.mask_urls = mask_urls
+        self.mask_mentions = mask_mentions
+        self.max_memory_keys = max_memory_keys
+        self.spill_dir = spill_dir
+        self._spill = None
+        self._spill_path = None
+        self._reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def normalize(self, text):
+        """Normalize ``text`` with this stage's options."""
+        return normalize_text(text, casefold=self.casefold, mask_urls=self.mask_urls,
+                              mask_mentions=self.mask_mentions)
+
+    def unique_texts(self, texts):
+        """Yield each distinct normalized text in ``texts`` once, in first-seen order.
+
+        Starts a new run: ``row_ids`` and ``stats`` are reset.
+        """
+        self._reset()
+        for text in texts:
+            normalized = self.normalize(text)
+            unique_id, is_new = self._assign(content_digest(normalized))
+            self.row_ids.append(unique_id)
+            self.stats.total += 1
+            if is_new:
+                self.stats.unique += 1
+                yield normalized
+
+    def close(self):
+        """Release the spill file, if one was created."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        if self._spill_path is not None:
+            try:
+                os.remove(self._spill_path)
+            except OSError:
+                pass
+            self._spill_path = None
+
+    def _reset(self):
+        self.close()
+        self._keys = {}
+        self.row_ids = array('q')
+        self.stats = DedupStats()
+
+    def _assign(self, digest):
+        """Return ``(unique_id, is_new)`` for a text digest."""
+        unique_id = self._keys.get(digest)
+        if unique_id is not None:
+            return unique_id, False
+
+        if self._spill is not None:
+            row = self._spill.execute('SELECT id FROM seen WHERE digest = ?', (digest,)).fetchone()
+            if row is not None:
+                return row[0], False
+
+        unique_id = self.stats.unique
+        if self.max_memory_keys is None or len(self._keys) < self.max_memory_keys:
+            self._keys[digest] = unique_id
+        else:
+            if self._spill is None:
+                self._open_spill()
+            self._spill.execute('INSERT INTO seen (digest, id) VALUES (?, ?)', (digest, unique_id))
+            self.stats.spilled += 1
+        return unique_id, True
+
+    def _open_spill(self):
+        fd, self._spill_path = tempfile.mkstemp(prefix='emotion-dedup-', suffix='.sqlite3',
+                                                dir=self.spill_dir)
+        os.close(fd)
+        self._spill = sqlite3.connect(self._spill_path)
+        self._spill.execute('PRAGMA journal_mode = OFF')
+        self._spill.execute('PRAGMA synchronous = OFF')
+        self._spill.execute('CREATE TABLE seen (digest BLOB PRIMARY KEY, id INTEGER) WITHOUT ROWID')
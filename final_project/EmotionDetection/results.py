@@ -0,0 +1,214 @@
+"""
+Columnar result container for batch emotion detection.
+
+Batch scoring can produce millions of rows. Keeping each row as a dict with
+five floats and a ``dominant_emotion`` string costs hundreds of bytes per row,
+so results are stored column-wise instead: one contiguous float32 buffer per
+emotion and a one-byte categorical code per row for the dominant emotion.
+
+NumPy and PyArrow are optional. The container itself only needs the standard
+library; ``to_numpy`` and ``to_arrow``/``write_parquet`` import their
+dependency lazily.
+"""
+
+import json
+import math
+from array import array
+
+# Emotion columns, in the order used by every score matrix in this package
+EMOTIONS = ('anger', 'disgust', 'fear', 'joy', 'sadness')
+
+# Categories for the dominant emotion code column. Code -1 marks a row that
+# failed to score (the same convention pandas uses for missing categoricals).
+DOMINANT_CATEGORIES = EMOTIONS + ('none',)
+MISSING_CODE = -1
+
+_CATEGORY_CODES = {name: code for code, name in enumerate(DOMINANT_CATEGORIES)}
+
+
+class EmotionBatchResult:
+    """Column-oriented emotion scores for a batch of texts.
+
+    Scores are kept in ``array('f')`` buffers (float32) and dominant emotions
+    in an ``array('b')`` buffer of codes into ``DOMINANT_CATEGORIES``. Rows
+    that failed to score hold NaN scores, a ``MISSING_CODE`` dominant code and
+    their error message in ``errors``.
+    """
+
+    def __init__(self):
+        self.scores = {emotion: array('f') for emotion in EMOTIONS}
+        self.dominant_codes = array('b')
+        self.errors = {}
+
+    @classmethod
+    def from_results(cls, results):
+        """Build a container from an iterable of ``emotion_detector`` results.
+
+        Args:
+            results: Iterable of result dicts or JSON error strings
+
+        Returns:
+            EmotionBatchResult: The populated container
+        """
+        batch = cls()
+        for result in results:
+            batch.append(result)
+        return batch
+
+    def __len__(self):
+        return len(self.dominant_codes)
+
+    def __getitem__(self, index):
+        """Return row ``index`` in the ``emotion_detector`` dict format."""
+        if index < 0:
+            index += len(self)
+        if index in self.errors:
+            return json.dumps(self.errors[index])
+        row = {emotion: self.scores[emotion][index] for emotion in EMOTIONS}
+        row['dominant_emotion'] = DOMINANT_CATEGORIES[self.dominant_codes[index]]
+        return row
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, result):
+        """Append one ``emotion_detector`` result.
+
+        Args:
+            result: A result dict, or a JSON error string as returned by
+                ``emotion_detector`` when the request failed
+        """
+        if isinstance(result, dict) and 'dominant_emotion' in result:
+            for emotion in EMOTIONS:
+                self.scores[emotion].append(result.get(emotion, 0))
+            self.dominant_codes.append(_CATEGORY_CODES[result['dominant_emotion']])
+            return
+
+        if isinstance(result, str):
+            try:
+                error = json.loads(result)
+            except json.JSONDecodeError:
+                error = {'error': 'Invalid response format', 'details': result}
+        else:
+            error = {'error': 'Invalid response format', 'details': repr(result)}
+        self.append_error(error)
+
+    def append_error(self, error):
+        """Append a failed row carrying the given error dict."""
+        self.errors[len(self)] = error
+        for emotion in EMOTIONS:
+            self.scores[emotion].append(math.nan)
+        self.dominant_codes.append(MISSING_CODE)
+
+    def extend(self, other):
+        """Append all rows of another ``EmotionBatchResult``."""
+        offset = len(self)
+        for emotion in EMOTIONS:
+            self.scores[emotion].extend(other.scores[emotion])
+        self.dominant_codes.extend(other.dominant_codes)
+        for index, error in other.errors.items():
+            self.errors[offset + index] = error
+
+    def take(self, indices):
+        """Return a new container with the rows at ``indices``, in order.
+
+        Used to fan results for unique texts back out to every input row.
+        """
+        batch = EmotionBatchResult()
+        for emotion in EMOTIONS:
+            column = self.scores[emotion]
+            batch.scores[emotion] = array('f', (column[i] for i in indices))
+        codes = self.dominant_codes
+        batch.dominant_codes = array('b', (codes[i] for i in indices))
+        if self.errors:
+            for position, index in enumerate(indices):
+                if index in self.errors:
+                    batch.errors[position] = self.errors[index]
+        return batch
+
+    def dominant_emotions(self):
+        """Return the dominant emotion of each row (``None`` for failed rows)."""
+        return [DOMINANT_CATEGORIES[code] if code != MISSING_CODE else None
+                for code in self.dominant_codes]
+
+    def to_dicts(self):
+        """Return the rows as a list of ``emotion_detector`` style results."""
+        return list(self)
+
+    def to_numpy(self):
+        """Export the columns as NumPy arrays without copying.
+
+        The returned arrays are views over the container's buffers, so they
+        must not outlive further ``append``/``extend`` calls on it.
+
+        Returns:
+            dict: ``float32`` array per emotion and an ``int8``
+            ``dominant_code`` array (codes index ``DOMINANT_CATEGORIES``)
+        """
+        import numpy as np
+
+        columns = {emotion: np.frombuffer(self.scores[emotion], dtype=np.float32)
+                   for emotion in EMOTIONS}
+        columns['dominant_code'] = np.frombuffer(self.dominant_codes, dtype=np.int8)
+        return columns
+
+    def score_matrix(self):
+        """Return an N x 5 ``float32`` matrix with columns in ``EMOTIONS`` order."""
+        import numpy as np
+
+        if not len(self):
+            return np.empty((0, len(EMOTIONS)), dtype=np.float32)
+        return np.column_stack([np.frombuffer(self.scores[emotion], dtype=np.float32)
+                                for emotion in EMOTIONS])
+
+    def to_arrow(self):
+        """Export the columns as a ``pyarrow.Table``.
+
+        Score columns are ``float32`` (null for failed rows) and
+        ``dominant_emotion`` is a dictionary-encoded column over
+        ``DOMINANT_CATEGORIES``.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError(
+                "pyarrow is required for Arrow/Parquet export: pip install pyarrow"
+            ) from e
+
+        validity = None
+        if self.errors:
+            # A boolean array's data buffer is a bitmap, usable directly as
+            # the validity bitmap of every column
+            valid = pa.array([code != MISSING_CODE for code in self.dominant_codes],
+                             type=pa.bool_())
+            validity = valid.buffers()[1]
+        columns = {}
+        for emotion in EMOTIONS:
+            values = pa.py_buffer(self.scores[emotion])
+            columns[emotion] = pa.Array.from_buffers(
+                pa.float32(), len(self), [validity, values]
+            )
+        indices = pa.Array.from_buffers(
+            pa.int8(), len(self), [validity, pa.py_buffer(self.dominant_codes)]
+        )
+        columns['dominant_emotion'] = pa.DictionaryArray.from_arrays(
+            indices, pa.array(DOMINANT_CATEGORIES, type=pa.string())
+        )
+        return pa.table(columns)
+
+    def write_parquet(self, path, **kwargs):
+        """Write the results to a Parquet file.
+
+        Args:
+            path (str): Destination file path
+            **kwargs: Passed through to ``pyarrow.parquet.write_table``
+        """
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "pyarrow is required for Arrow/Parquet export: pip install pyarrow"
+            ) from e
+
+        pq.write_table(self.to_arrow(), path, **kwargs)
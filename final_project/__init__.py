@@ -4,7 +4,7 @@ Emotion Detection Package
 This package provides sentiment/emotion analysis functionality using IBM Watson NLP.
 """
 
-from .emotion_detection import emotion_detector, sentiment_analyzer
+from .emotion_detection import emotion_detector, sentiment_analyzer, warm_up
 
-__all__ = ['emotion_detector', 'sentiment_analyzer']
+__all__ = ['emotion_detector', 'sentiment_analyzer', 'warm_up']
 __version__ = '1.0.0'
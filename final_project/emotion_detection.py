@@ -16,13 +16,25 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 from requests.auth import HTTPBasicAuth
 from requests.exceptions import ConnectionError, Timeout, RequestException
-from watson_config import get_watson_config, format_watson_response, USE_PUBLIC_WATSON
+from watson_config import get_watson_config, get_request_timeout, format_watson_response, USE_PUBLIC_WATSON
 
-def emotion_detector(text_to_analyse):  # Define a function named emotion_detector that takes a string input (text_to_analyse)
+# The pooled session, warm-up and deadline helpers live in the library so the
+# service and batch paths share one connection pool
+try:
+    from .EmotionDetection.emotion_detection import POOL_SIZE, get_session, warm_up, deadline_exceeded_error
+    from .EmotionDetection.postprocess import dominant_emotion, sentiment_from_emotions
+except ImportError:
+    # Running as a script: this directory is on sys.path
+    from EmotionDetection.emotion_detection import POOL_SIZE, get_session, warm_up, deadline_exceeded_error
+    from EmotionDetection.postprocess import dominant_emotion, sentiment_from_emotions
+
+def emotion_detector(text_to_analyse, deadline=None):  # Define a function named emotion_detector that takes a string input (text_to_analyse)
     """Analyze emotion of the given text using Watson NLP service.
 
     Args:
         text_to_analyse (str): The text to analyze
+        deadline (Deadline): Optional deadline of the caller. The request is
+            not sent once it has passed, and it caps the connect/read timeouts.
         
     Returns:
         str: JSON response from the sentiment analysis service
@@ -33,13 +45,18 @@ def emotion_detector(text_to_analyse):  # Define a function named emotion_detect
     header = config["headers"]
     myobj = config["payload_format"](text_to_analyse)
     
+    # Separate connect and read timeouts, capped by the caller's deadline
+    timeout = get_request_timeout(deadline)
+    if min(timeout) <= 0:
+        return deadline_exceeded_error(deadline)
+    
     try:
         # Add authentication for public Watson API
         if USE_PUBLIC_WATSON:
             auth = HTTPBasicAuth('apikey', os.environ.get('WATSON_API_KEY', ''))
-            response = requests.post(api_url, json=myobj, headers=header, auth=auth, timeout=10)
+            response = get_session().post(api_url, json=myobj, headers=header, auth=auth, timeout=timeout)
         else:
-            response = requests.post(api_url, json=myobj, headers=header, timeout=10)  # Send a POST request to the API with the text and headers and a timeout
+            response = get_session().post(api_url, json=myobj, headers=header, timeout=timeout)  # Send a POST request to the API with the text and headers and a timeout
         response.raise_for_status()  # Raise an exception for bad status codes
         
         # Parse the Watson response
@@ -49,17 +66,14 @@ def emotion_detector(text_to_analyse):  # Define a function named emotion_detect
         if 'emotion' in response_data and 'document' in response_data['emotion']:
             emotions = response_data['emotion']['document']['emotion']
             
-            # Find the dominant emotion
-            dominant_emotion = max(emotions.items(), key=lambda x: x[1])[0]
-            
-            # Return in the required format
+            # Return in the required format; all-zero scores give 'none'
             return {
                 'anger': emotions.get('anger', 0),
                 'disgust': emotions.get('disgust', 0),
                 'fear': emotions.get('fear', 0),
                 'joy': emotions.get('joy', 0),
                 'sadness': emotions.get('sadness', 0),
-                'dominant_emotion': dominant_emotion
+                'dominant_emotion': dominant_emotion(emotions)
             }
         else:
             # If emotion data is not available, return zeros
@@ -72,11 +86,17 @@ def emotion_detector(text_to_analyse):  # Define a function named emotion_detect
                 'dominant_emotion': 'none'
             }
     except ConnectionError as e:
+        # requests' ConnectTimeout is both a ConnectionError and a Timeout, so
+        # a connect cut short by the deadline lands here
+        if deadline is not None and deadline.expired:
+            return deadline_exceeded_error(deadline)
         # Handle connection errors
         error_msg = f"Connection Error: Unable to reach the sentiment analysis service. The service may be down or unreachable from your network."
         print(error_msg)
         return json.dumps({"error": error_msg, "details": str(e)})
     except Timeout as e:
+        if deadline is not None and deadline.expired:
+            return deadline_exceeded_error(deadline)
         # Handle timeout errors
         error_msg = "Timeout Error: The request to the sentiment analysis service timed out."
         print(error_msg)
@@ -93,28 +113,19 @@ def emotion_detector(text_to_analyse):  # Define a function named emotion_detect
         return json.dumps({"error": error_msg, "details": str(e)})
 
 # Alias for backward compatibility with tests
-def sentiment_analyzer(text_to_analyse):
+def sentiment_analyzer(text_to_analyse, deadline=None):
     """Alias for emotion_detector to maintain compatibility with tests.
     
     Converts emotion analysis to sentiment format for backward compatibility.
     """
-    result = emotion_detector(text_to_analyse)
+    result = emotion_detector(text_to_analyse, deadline=deadline)
     
     # If it's already a string (error), return as-is
     if isinstance(result, str):
         return result
     
     # Convert emotion to sentiment based on dominant emotion
-    if result['dominant_emotion'] in ['joy']:
-        sentiment = 'positive'
-        score = result['joy']
-    elif result['dominant_emotion'] in ['anger', 'disgust', 'fear', 'sadness']:
-        sentiment = 'negative'
-        # Use the dominant negative emotion's score
-        score = -result[result['dominant_emotion']]
-    else:
-        sentiment = 'neutral'
-        score = 0.0
+    sentiment, score = sentiment_from_emotions(result)
     
     return json.dumps({
         "documentSentiment": {
@@ -32,6 +32,10 @@ setup(
     install_requires=[
         "requests>=2.25.0",
     ],
+    extras_require={
+        "numpy": ["numpy>=1.20"],
+        "arrow": ["pyarrow>=8.0"],
+    },
     entry_points={
         "console_scripts": [
             "emotion-detector=EmotionDetection.emotion_detection:main",
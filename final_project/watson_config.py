@@ -3,6 +3,7 @@ Configuration for Watson Sentiment Analysis API endpoints
 """
 
 import os
+import time
 
 # Try to load environment variables from .env file
 try:
@@ -60,10 +61,80 @@ PUBLIC_WATSON_ENDPOINT = {
 # Always use public Watson endpoint
 ACTIVE_ENDPOINT = PUBLIC_WATSON_ENDPOINT
 
+# Timeouts for Watson requests in seconds: establishing the connection, and
+# waiting for the response once connected
+CONNECT_TIMEOUT = float(os.environ.get('WATSON_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.environ.get('WATSON_READ_TIMEOUT', '10'))
+
 def get_watson_config():
     """Get the active Watson API configuration"""
     return ACTIVE_ENDPOINT
 
+def get_model_version():
+    """
+    Get an identifier for the model/endpoint that produces results
+
+    Stored alongside persisted results so they can be re-scored when the
+    model changes. Set WATSON_MODEL_VERSION to override the derived value.
+    """
+    override = os.environ.get('WATSON_MODEL_VERSION')
+    if override:
+        return override
+    config = get_watson_config()
+    model_id = config["headers"].get("grpc-metadata-mm-model-id", "emotion")
+    return f"{config['url']}#{model_id}"
+
+class Deadline:
+    """
+    Point in time after which the caller no longer wants a result
+    
+    Created at the edge (e.g. from a request header) and passed down the call
+    chain so that queued work can be abandoned once the caller has given up.
+    It also caps the connect and read timeouts of each HTTP request. requests
+    applies the read timeout to each socket read rather than to the whole
+    response, so a slowly trickling response can still run past the deadline.
+    """
+    
+    def __init__(self, expires_at):
+        # time.monotonic() value at which the deadline expires
+        self.expires_at = expires_at
+    
+    @classmethod
+    def after(cls, seconds):
+        """Deadline that expires the given number of seconds from now"""
+        return cls(time.monotonic() + seconds)
+    
+    @classmethod
+    def at_epoch(cls, timestamp):
+        """Deadline that expires at the given Unix timestamp (wall clock)"""
+        return cls.after(timestamp - time.time())
+    
+    def remaining(self):
+        """Seconds left before the deadline (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+    
+    def __repr__(self):
+        return f"Deadline(remaining={self.remaining():.3f}s)"
+
+def get_request_timeout(deadline=None):
+    """
+    Get the (connect, read) timeout for a Watson request
+    
+    Args:
+        deadline: Optional Deadline that caps both timeouts
+        
+    Returns:
+        Tuple of connect and read timeouts in seconds, as accepted by requests
+    """
+    if deadline is None:
+        return (CONNECT_TIMEOUT, READ_TIMEOUT)
+    remaining = deadline.remaining()
+    return (min(CONNECT_TIMEOUT, remaining), min(READ_TIMEOUT, remaining))
+
 def format_watson_response(response_text, is_public_api=True):
     """
     Format Watson response to a consistent format
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+Load-test and soak harness for the Emotion Detection Flask service.
+
+By default this starts a stub Watson backend and the app (in a subprocess
+pointed at the stub), drives traffic at /emotionDetector, and reports an
+HDR-style latency histogram checked against SLOs. Use --target to test an
+already running service instead.
+
+Modes:
+    closed loop  --concurrency N workers send back-to-back requests
+    open loop    --rate R (or --ramp START:END) requests/second on a fixed
+                 schedule; latency is measured from each request's intended
+                 send time, so queueing delay is not hidden (no coordinated
+                 omission)
+    soak         --soak samples the app process's memory, file descriptors
+                 and socket count while the test runs and reports their growth
+
+Examples:
+    python loadtest.py --duration 30 --concurrency 16 --slo p99=250ms
+    python loadtest.py --rate 200 --duration 60 --slo p99=100ms --slo error_rate=0.001
+    python loadtest.py --ramp 10:500 --duration 120 --hgrm ramp.hgrm
+    python loadtest.py --soak --rate 50 --duration 3600 --slo rss_growth_mb=50
+
+Exits with status 1 if any SLO fails.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+EMOTIONS = ('anger', 'disgust', 'fear', 'joy', 'sadness')
+
+SAMPLE_TEXTS = [
+    "I am so happy I am doing this!",
+    "I hate working long hours.",
+    "I am really afraid that this will happen.",
+    "I am so mad about what happened today.",
+    "This is the saddest news I have heard in years.",
+    "The product arrived on time and works as described.",
+]
+
+
+class LatencyHistogram:
+    """
+    Log-linear latency histogram in the style of HdrHistogram.
+
+    Values are recorded in microseconds. Values below 2**sub_bucket_bits are
+    exact; larger ones keep their top sub_bucket_bits bits, so each power-of-two
+    range is split into 2**(sub_bucket_bits - 1) linear buckets and any value
+    is reported within a relative error of 2**-(sub_bucket_bits - 1) (about
+    0.2% with the default).
+    """
+
+    def __init__(self, sub_bucket_bits=10):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts = {}
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._lock = threading.Lock()
+
+    def _bucket(self, value):
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return shift, value >> shift
+
+    def record(self, seconds):
+        """Record one latency given in seconds."""
+        value = max(1, int(seconds * 1e6))
+        key = self._bucket(value)
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.total += 1
+            self.max = max(self.max, value)
+            self.min = value if self.min is None else min(self.min, value)
+
+    def _bucket_values(self):
+        """Yield (highest value in bucket, count) in increasing value order."""
+        for shift, sub in sorted(self.counts, key=lambda key: key[1] << key[0]):
+            yield ((sub + 1) << shift) - 1, self.counts[(shift, sub)]
+
+    def value_at_percentile(self, percentile):
+        """Latency in seconds at the given percentile (0-100)."""
+        if not self.total:
+            return 0.0
+        threshold = max(1, int(round(self.total * percentile / 100.0)))
+        seen = 0
+        for value, count in self._bucket_values():
+            seen += count
+            if seen >= threshold:
+                return min(value, self.max) / 1e6
+        return self.max / 1e6
+
+    def mean(self):
+        if not self.total:
+            return 0.0
+        return sum(value * count for value, count in self._bucket_values()) / self.total / 1e6
+
+    def percentile_distribution(self, ticks_per_half_distance=5):
+        """
+        Yield (value_ms, percentile, total_count) rows like HdrHistogram's
+        outputPercentileDistribution, with finer steps towards the tail.
+        """
+        percentile, half_distance = 0.0, 50.0
+        while self.total:
+            value = self.value_at_percentile(percentile)
+            count = max(1, int(round(self.total * percentile / 100.0)))
+            yield value * 1000, percentile / 100.0, count
+            if percentile >= 100.0 or count >= self.total:
+                break
+            percentile += half_distance / ticks_per_half_distance
+            if percentile >= 100.0 - half_distance:
+                half_distance /= 2
+        if self.total:
+            yield self.max / 1000.0, 1.0, self.total
+
+    def write_hgrm(self, path):
+        """Write the percentile distribution in HdrHistogram's .hgrm text format."""
+        with open(path, 'w') as f:
+            f.write(f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}\n\n")
+            for value, percentile, count in self.percentile_distribution():
+                inverse = 1 / (1 - percentile) if percentile < 1 else float('inf')
+                f.write(f"{value:12.3f} {percentile:14.12f} {count:10d} {inverse:14.2f}\n")
+            f.write(f"#[Mean    = {self.mean() * 1000:12.3f}, Max = {self.max / 1000:12.3f}]\n")
+            f.write(f"#[Total count    = {self.total:12d}]\n")
+
+
+class StubWatsonHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the Watson NLU analyze endpoint."""
+
+    protocol_version = 'HTTP/1.1'
+    latency = 0.02
+    jitter = 0.01
+    error_rate = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+        if random.random() < self.error_rate:
+            body = b'{"error": "stub failure", "code": 500}'
+            self.send_response(500)
+        else:
+            scores = [random.random() for _ in EMOTIONS]
+            total = sum(scores)
+            emotion = {name: score / total for name, score in zip(EMOTIONS, scores)}
+            body = json.dumps({'emotion': {'document': {'emotion': emotion}}}).encode('utf-8')
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_watson(latency, jitter, error_rate):
+    """Start the stub Watson server on a free port; returns (server, url)."""
+    handler = type('ConfiguredStubWatsonHandler', (StubWatsonHandler,), {
+        'latency': latency, 'jitter': jitter, 'error_rate': error_rate
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1/analyze?version=2022-04-07"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(watson_url, port, startup_timeout=30):
+    """Run app.py in a subprocess pointed at the stub backend; returns the process."""
+    env = dict(os.environ, WATSON_URL=watson_url, WATSON_API_KEY='loadtest')
+    code = ("from werkzeug.serving import run_simple; from app import app; "
+            f"run_simple('127.0.0.1', {port}, app, threaded=True)")
+    process = subprocess.Popen([sys.executable, '-c', code], env=env,
+                               cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    # /health answers 503 while the app warms up; poll until it reports ready
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app exited during startup with status {process.returncode}")
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+        try:
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return process
+        except (OSError, http.client.HTTPException):
+            pass
+        finally:
+            connection.close()
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("app did not become healthy in time")
+
+
+class ProcessSampler:
+    """Periodically samples RSS, open file descriptors and sockets of a process (Linux /proc)."""
+
+    def __init__(self, pid, interval):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def sample(self):
+        proc = f"/proc/{self.pid}"
+        try:
+            with open(f"{proc}/status") as f:
+                rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+            fds = sockets = 0
+            for fd in os.listdir(f"{proc}/fd"):
+                fds += 1
+                try:
+                    if os.readlink(f"{proc}/fd/{fd}").startswith('socket:'):
+                        sockets += 1
+                except OSError:
+                    pass
+        except (OSError, StopIteration):
+            return
+        self.samples.append((time.monotonic(), rss_kb / 1024.0, fds, sockets))
+
+    def _run(self):
+        self.sample()
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def summary(self):
+        """Start/end/peak values and growth per hour (least-squares slope)."""
+        if len(self.samples) < 2:
+            return None
+        times = [sample[0] for sample in self.samples]
+        result = {}
+        for index, name in ((1, 'rss_mb'), (2, 'fds'), (3, 'sockets')):
+            values = [sample[index] for sample in self.samples]
+            mean_t, mean_v = sum(times) / len(times), sum(values) / len(values)
+            var_t = sum((t - mean_t) ** 2 for t in times)
+            slope = sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / var_t if var_t else 0.0
+            result[name] = {
+                'start': values[0], 'end': values[-1], 'peak': max(values),
+                'growth': values[-1] - values[0], 'growth_per_hour': slope * 3600,
+            }
+        return result
+
+
+class LoadGenerator:
+    """Sends requests to the service and records latencies and outcomes."""
+
+    def __init__(self, base_url, path, unique_texts, timeout, warmup):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.path = path
+        self.unique_texts = unique_texts
+        self.timeout = timeout
+        self.histogram = LatencyHistogram()
+        self.statuses = {}
+        self.errors = 0
+        self.sent = 0
+        self.last_completion = None
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.measure_from = time.monotonic() + warmup
+
+    def _next_text(self):
+        with self._lock:
+            self._counter += 1
+            number = self._counter
+        text = random.choice(SAMPLE_TEXTS)
+        # Distinct texts defeat the result cache unless a pool size is given
+        suffix = number if self.unique_texts is None else number % self.unique_texts
+        return f"{text} #{suffix}"
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def send(self, intended_start=None):
+        """Send one request; latency is measured from intended_start when given."""
+        started = time.monotonic()
+        if intended_start is None:
+            intended_start = started
+        body = json.dumps({'text': self._next_text()})
+        status = None
+        try:
+            connection = self._connection()
+            connection.request('POST', self.path, body=body,
+                               headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+                connection.close()
+                self._local.connection = None
+        except (OSError, http.client.HTTPException):
+            connection = getattr(self._local, 'connection', None)
+            if connection is not None:
+                connection.close()
+            self._local.connection = None
+        finished = time.monotonic()
+
+        if intended_start < self.measure_from:
+            return
+        with self._lock:
+            self.sent += 1
+            self.last_completion = max(self.last_completion or finished, finished)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status is None or status >= 500:
+                self.errors += 1
+        self.histogram.record(finished - intended_start)
+
+    def run_closed(self, concurrency, duration, think_time):
+        """Closed loop: each worker sends its next request when the previous one completes."""
+        end = time.monotonic() + duration
+
+        def worker():
+            while time.monotonic() < end:
+                self.send()
+                if think_time:
+                    time.sleep(think_time)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def throughput(self):
+        """
+        Completed requests per second over the real measurement time, from the
+        end of the warm-up to the last completion. In open loop this drops
+        below the offered rate once the service falls behind the schedule.
+        """
+        if self.last_completion is None or self.last_completion <= self.measure_from:
+            return 0.0
+        return self.sent / (self.last_completion - self.measure_from)
+
+    def run_open(self, start_rate, end_rate, duration, max_inflight):
+        """Open loop: requests are scheduled at the target rate regardless of completions."""
+        with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+            begin = time.monotonic()
+            offset = 0.0
+            while offset < duration:
+                intended = begin + offset
+                delay = intended - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.send, intended)
+                # Linear ramp between start_rate and end_rate
+                rate = start_rate + (end_rate - start_rate) * (offset / duration)
+                offset += 1.0 / max(rate, 1e-6)
+
+
+def parse_duration_ms(value):
+    """Parse '250ms', '1.5s' or a bare number of milliseconds into seconds."""
+    value = value.strip().lower()
+    if value.endswith('ms'):
+        return float(value[:-2]) / 1000
+    if value.endswith('s'):
+        return float(value[:-1])
+    return float(value) / 1000
+
+
+def parse_slos(items):
+    """Parse NAME=VALUE SLO arguments into a dict."""
+    slos = {}
+    for item in items:
+        name, _, value = item.partition('=')
+        name = name.strip().lower()
+        if name.startswith('p') and name[1:].replace('.', '', 1).isdigit():
+            slos[name] = parse_duration_ms(value)
+        elif name in ('error_rate', 'min_rps', 'rss_growth_mb', 'fd_growth', 'socket_growth'):
+            slos[name] = float(value)
+        else:
+            raise argparse.ArgumentTypeError(f"unknown SLO '{name}'")
+    return slos
+
+
+def check_slos(slos, report):
+    """Return a list of (slo, limit, actual, passed) tuples."""
+    checks = []
+    for name, limit in slos.items():
+        if name.startswith('p'):
+            actual = report['latency_ms'].get(name)
+            if actual is None:
+                actual = report['histogram'].value_at_percentile(float(name[1:])) * 1000
+            checks.append((name, limit * 1000, actual, actual <= limit * 1000))
+        elif name == 'error_rate':
+            checks.append((name, limit, report['error_rate'], report['error_rate'] <= limit))
+        elif name == 'min_rps':
+            checks.append((name, limit, report['rps'], report['rps'] >= limit))
+        else:
+            resource = {'rss_growth_mb': 'rss_mb', 'fd_growth': 'fds', 'socket_growth': 'sockets'}[name]
+            process = report.get('process')
+            if process is None:
+                checks.append((name, limit, None, False))
+            else:
+                actual = process[resource]['growth']
+                checks.append((name, limit, actual, actual <= limit))
+    return checks
+
+
+def main():
+    """Run the load test from the command line."""
+    parser = argparse.ArgumentParser(
+        description='Load-test and soak harness for the Emotion Detection service',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='SLOs: pNN=<ms>, error_rate=<fraction>, min_rps=<n>, '
+               'rss_growth_mb=<mb>, fd_growth=<n>, socket_growth=<n>'
+    )
+    parser.add_argument('--target', help='Base URL of a running service (default: start app.py locally)')
+    parser.add_argument('--path', default='/emotionDetector', help='Endpoint to POST to')
+    parser.add_argument('--duration', type=float, default=30, help='Test duration in seconds')
+    parser.add_argument('--warmup', type=float, default=2, help='Seconds excluded from the results')
+    parser.add_argument('--concurrency', type=int, default=8, help='Closed-loop workers')
+    parser.add_argument('--think-time', type=float, default=0, help='Closed-loop pause between requests (s)')
+    parser.add_argument('--rate', type=float, help='Open-loop request rate (requests/second)')
+    parser.add_argument('--ramp', help='Open-loop linear ramp START:END in requests/second')
+    parser.add_argument('--max-inflight', type=int, default=256, help='Open-loop concurrent request cap')
+    parser.add_argument('--unique-texts', type=int,
+                        help='Cycle through this many distinct texts (default: every text is distinct)')
+    parser.add_argument('--timeout', type=float, default=30, help='Client request timeout (s)')
+    parser.add_argument('--soak', action='store_true', help='Track app memory, fds and sockets over time')
+    parser.add_argument('--sample-interval', type=float, default=5, help='Soak sampling interval (s)')
+    parser.add_argument('--app-pid', type=int, help='PID to sample in soak mode when using --target')
+    parser.add_argument('--stub-latency', type=float, default=0.02, help='Stub Watson mean latency (s)')
+    parser.add_argument('--stub-jitter', type=float, default=0.01, help='Stub Watson latency std dev (s)')
+    parser.add_argument('--stub-error-rate', type=float, default=0.0, help='Stub Watson failure fraction')
+    parser.add_argument('--slo', action='append', default=[], help='SLO as NAME=VALUE (repeatable)')
+    parser.add_argument('--hgrm', help='Write the latency distribution in .hgrm format to this file')
+    parser.add_argument('--json', help='Write the report as JSON to this file')
+    args = parser.parse_args()
+
+    try:
+        slos = parse_slos(args.slo)
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+
+    stub = process = None
+    target, app_pid = args.target, args.app_pid
+    if target is None:
+        stub, watson_url = start_stub_watson(args.stub_latency, args.stub_jitter, args.stub_error_rate)
+        port = free_port()
+        process = start_app(watson_url, port)
+        target, app_pid = f"http://127.0.0.1:{port}", process.pid
+
+    sampler = None
+    if args.soak:
+        if app_pid is None or not os.path.isdir(f"/proc/{app_pid}"):
+            print("Soak tracking needs a local app process on Linux (use --app-pid with --target)")
+        else:
+            sampler = ProcessSampler(app_pid, args.sample_interval)
+            sampler.start()
+
+    generator = LoadGenerator(target, args.path, args.unique_texts, args.timeout, args.warmup)
+    total = args.warmup + args.duration
+    try:
+        if args.ramp or args.rate:
+            if args.ramp:
+                start_rate, end_rate = (float(part) for part in args.ramp.split(':'))
+            else:
+                start_rate = end_rate = args.rate
+            mode = f"open loop, {start_rate:g} -> {end_rate:g} rps"
+            generator.run_open(start_rate, end_rate, total, args.max_inflight)
+        else:
+            mode = f"closed loop, {args.concurrency} workers"
+            generator.run_closed(args.concurrency, total, args.think_time)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if stub is not None:
+            stub.shutdown()
+
+    histogram = generator.histogram
+    elapsed = (generator.last_completion - generator.measure_from
+               if generator.last_completion is not None else 0.0)
+    report = {
+        'mode': mode,
+        'target': target + args.path,
+        'duration_s': args.duration,
+        'elapsed_s': max(0.0, elapsed),
+        'requests': generator.sent,
+        'rps': generator.throughput(),
+        'error_rate': generator.errors / generator.sent if generator.sent else 0.0,
+        'statuses': {str(status): count for status, count in generator.statuses.items()},
+        'latency_ms': {
+            f"p{p:g}": histogram.value_at_percentile(p) * 1000
+            for p in (50, 90, 99, 99.9)
+        },
+        'histogram': histogram,
+        'process': sampler.summary() if sampler else None,
+    }
+    report['latency_ms']['mean'] = histogram.mean() * 1000
+    report['latency_ms']['max'] = histogram.max / 1000
+    checks = check_slos(slos, report)
+
+    print(f"\nLoad test: {report['mode']} against {report['target']}")
+    print(f"  Requests:   {report['requests']} completed in {report['elapsed_s']:.1f}s "
+          f"({report['rps']:.1f} rps)")
+    print(f"  Errors:     {report['error_rate']:.2%}  statuses: {report['statuses']}")
+    print("  Latency (ms):")
+    for name, value in report['latency_ms'].items():
+        print(f"    {name:>6}: {value:10.2f}")
+    print("\n  Percentile distribution:")
+    print(f"    {'Value(ms)':>10} {'Percentile':>12} {'TotalCount':>10}")
+    for value, percentile, count in histogram.percentile_distribution(ticks_per_half_distance=1):
+        print(f"    {value:10.2f} {percentile:12.6f} {count:10d}")
+    if report['process']:
+        print("\n  Soak (app process):")
+        for name, values in report['process'].items():
+            print(f"    {name:>8}: start {values['start']:.1f}, end {values['end']:.1f}, "
+                  f"peak {values['peak']:.1f}, growth/hour {values['growth_per_hour']:+.1f}")
+    if checks:
+        print("\n  SLOs:")
+        for name, limit, actual, passed in checks:
+            shown = 'n/a' if actual is None else f"{actual:.4g}"
+            print(f"    {'PASS' if passed else 'FAIL'}  {name}: {shown} (limit {limit:.4g})")
+
+    if args.hgrm:
+        histogram.write_hgrm(args.hgrm)
+    if args.json:
+        serializable = {key: value for key, value in report.items() if key != 'histogram'}
+        serializable['slos'] = [
+            {'slo': name, 'limit': limit, 'actual': actual, 'passed': passed}
+            for name, limit, actual, passed in checks
+        ]
+        with open(args.json, 'w') as f:
+            json.dump(serializable, f, indent=2)
+
+    sys.exit(0 if all(passed for *_, passed in checks) else 1)
+
+
+if __name__ == '__main__':
+    main()
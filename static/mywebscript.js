@@ -1,18 +1,131 @@
-let RunSentimentAnalysis = () => {
-    const textToAnalyze = document.getElementById("textToAnalyze").value;
-    
-    if (!textToAnalyze.trim()) {
-        document.getElementById("system_response").innerHTML = 
-            '<div class="alert alert-warning">Please enter some text to analyze.</div>';
+// Format emotion scores as percentage
+const formatScore = (score) => (score * 100).toFixed(1) + '%';
+
+const capitalize = (word) => word.charAt(0).toUpperCase() + word.slice(1);
+
+const escapeHtml = (text) => text
+    .replace(/&/g, '&amp;')
+    .replace(/</g, '&lt;')
+    .replace(/>/g, '&gt;')
+    .replace(/"/g, '&quot;');
+
+// Choose color based on dominant emotion
+let alertColorFor = (dominant) => {
+    if (dominant === 'joy') return 'success';
+    if (['anger', 'fear', 'sadness', 'disgust'].includes(dominant)) return 'warning';
+    return 'info';
+}
+
+let renderEmotionResults = (emotions, title) => {
+    const dominant = emotions.dominant_emotion;
+
+    return `
+        <div class="alert alert-${alertColorFor(dominant)}">
+            <h4>${title}</h4>
+            <div class="row mt-3">
+                <div class="col-md-6">
+                    <h5>Emotion Scores:</h5>
+                    <ul class="list-unstyled">
+                        <li><strong>Joy:</strong> ${formatScore(emotions.joy)}</li>
+                        <li><strong>Anger:</strong> ${formatScore(emotions.anger)}</li>
+                        <li><strong>Disgust:</strong> ${formatScore(emotions.disgust)}</li>
+                        <li><strong>Fear:</strong> ${formatScore(emotions.fear)}</li>
+                        <li><strong>Sadness:</strong> ${formatScore(emotions.sadness)}</li>
+                    </ul>
+                </div>
+                <div class="col-md-6">
+                    <h5>Dominant Emotion:</h5>
+                    <p class="lead"><strong>${capitalize(dominant)}</strong></p>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+let renderError = (error, details) => `
+    <div class="alert alert-danger">
+        <h4>Error</h4>
+        <p>${error}</p>
+        ${details ? `<small>${details}</small>` : ''}
+    </div>
+`;
+
+let renderConnectionError = (error) => {
+    document.getElementById("system_response").innerHTML = `
+        <div class="alert alert-danger">
+            <h4>Connection Error</h4>
+            <p>Failed to connect to the server. Please try again.</p>
+        </div>
+    `;
+    console.error('Error:', error);
+}
+
+// Render one event of the /emotionDetector/stream NDJSON response
+let renderStreamEvent = (event) => {
+    if (event.type === 'start') {
+        document.getElementById("system_response").innerHTML = `
+            <div id="stream_summary" class="alert alert-info">Analyzing ${event.chunks} part(s)...</div>
+            <ul id="stream_chunks" class="list-group"></ul>
+        `;
+    } else if (event.type === 'chunk') {
+        const item = document.createElement('li');
+        if (event.status === 'success') {
+            const dominant = event.emotions.dominant_emotion;
+            const score = dominant === 'none' ? '' : ` (${formatScore(event.emotions[dominant])})`;
+            item.className = `list-group-item list-group-item-${alertColorFor(dominant)}`;
+            item.innerHTML = `<strong>${capitalize(dominant)}${score}</strong> &mdash; ${escapeHtml(event.text)}`;
+        } else {
+            item.className = 'list-group-item list-group-item-danger';
+            item.innerHTML = `<strong>Error</strong> &mdash; ${escapeHtml(event.text)}<br><small>${event.error}</small>`;
+        }
+        // Chunks finish out of order; keep the list in sentence order
+        item.dataset.index = event.index;
+        const list = document.getElementById("stream_chunks");
+        const next = Array.from(list.children).find(child => Number(child.dataset.index) > event.index);
+        list.insertBefore(item, next || null);
+    } else if (event.type === 'summary') {
+        document.getElementById("stream_summary").outerHTML = event.status === 'success'
+            ? renderEmotionResults(event.emotions, 'Emotion Analysis Results')
+            : renderError(event.error);
+    }
+}
+
+// Streaming variant: results for each sentence are shown as soon as they arrive
+let runStreamingAnalysis = async (textToAnalyze) => {
+    const response = await fetch('/emotionDetector/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ text: textToAnalyze })
+    });
+
+    if (!response.ok) {
+        const data = await response.json();
+        document.getElementById("system_response").innerHTML = renderError(data.error, data.details);
         return;
     }
-    
-    // Show loading state
-    document.getElementById("system_response").innerHTML = 
-        '<div class="alert alert-info">Analyzing...</div>';
-    
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffered = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => renderStreamEvent(JSON.parse(line)));
+    }
+    if (buffered.trim()) renderStreamEvent(JSON.parse(buffered));
+}
+
+// Non-streaming fallback for browsers without fetch body streams
+let runAnalysis = (textToAnalyze) => {
     // Use POST method with JSON payload
-    fetch('/emotionDetector', {
+    return fetch('/emotionDetector', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
@@ -22,38 +135,8 @@ let RunSentimentAnalysis = () => {
     .then(response => response.json())
     .then(data => {
         if (data.status === 'success' && data.emotions) {
-            const emotions = data.emotions;
-            const dominant = emotions.dominant_emotion;
-            
-            // Choose color based on dominant emotion
-            let alertColor = 'info';
-            if (dominant === 'joy') alertColor = 'success';
-            else if (['anger', 'fear', 'sadness', 'disgust'].includes(dominant)) alertColor = 'warning';
-            
-            // Format emotion scores as percentage
-            const formatScore = (score) => (score * 100).toFixed(1) + '%';
-            
-            document.getElementById("system_response").innerHTML = `
-                <div class="alert alert-${alertColor}">
-                    <h4>Emotion Analysis Results</h4>
-                    <div class="row mt-3">
-                        <div class="col-md-6">
-                            <h5>Emotion Scores:</h5>
-                            <ul class="list-unstyled">
-                                <li><strong>Joy:</strong> ${formatScore(emotions.joy)}</li>
-                                <li><strong>Anger:</strong> ${formatScore(emotions.anger)}</li>
-                                <li><strong>Disgust:</strong> ${formatScore(emotions.disgust)}</li>
-                                <li><strong>Fear:</strong> ${formatScore(emotions.fear)}</li>
-                                <li><strong>Sadness:</strong> ${formatScore(emotions.sadness)}</li>
-                            </ul>
-                        </div>
-                        <div class="col-md-6">
-                            <h5>Dominant Emotion:</h5>
-                            <p class="lead"><strong>${dominant.charAt(0).toUpperCase() + dominant.slice(1)}</strong></p>
-                        </div>
-                    </div>
-                </div>
-            `;
+            document.getElementById("system_response").innerHTML =
+                renderEmotionResults(data.emotions, 'Emotion Analysis Results');
         } else if (data.status === 'success' && data.data) {
             // Fallback for other formats
             document.getElementById("system_response").innerHTML = `
@@ -62,22 +145,25 @@ let RunSentimentAnalysis = () => {
                 </div>
             `;
         } else if (data.status === 'error') {
-            document.getElementById("system_response").innerHTML = `
-                <div class="alert alert-danger">
-                    <h4>Error</h4>
-                    <p>${data.error}</p>
-                    ${data.details ? `<small>${data.details}</small>` : ''}
-                </div>
-            `;
+            document.getElementById("system_response").innerHTML = renderError(data.error, data.details);
         }
-    })
-    .catch(error => {
-        document.getElementById("system_response").innerHTML = `
-            <div class="alert alert-danger">
-                <h4>Connection Error</h4>
-                <p>Failed to connect to the server. Please try again.</p>
-            </div>
-        `;
-        console.error('Error:', error);
     });
 }
+
+let RunSentimentAnalysis = () => {
+    const textToAnalyze = document.getElementById("textToAnalyze").value;
+
+    if (!textToAnalyze.trim()) {
+        document.getElementById("system_response").innerHTML =
+            '<div class="alert alert-warning">Please enter some text to analyze.</div>';
+        return;
+    }
+
+    // Show loading state
+    document.getElementById("system_response").innerHTML =
+        '<div class="alert alert-info">Analyzing...</div>';
+
+    const canStream = window.ReadableStream && window.TextDecoder;
+    const analysis = canStream ? runStreamingAnalysis(textToAnalyze) : runAnalysis(textToAnalyze);
+    analysis.catch(renderConnectionError);
+}